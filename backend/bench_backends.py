@@ -0,0 +1,110 @@
+"""Accuracy vs latency of each detector backend against eager torch.
+
+Runs offline: point it at local weights and a local image folder (defaults to
+the sample images bundled with ultralytics):
+
+    python bench_backends.py --weights yolov8n.pt --images ./samples
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+# Never try to pip-install exporters or download assets mid-benchmark
+os.environ.setdefault("YOLO_AUTOINSTALL", "false")
+os.environ.setdefault("YOLO_OFFLINE", "true")
+
+import cv2
+import numpy as np
+
+from detector_backends import BACKENDS, DEFAULT_CACHE_DIR, load_backend
+from ingest import FrameBuffers
+from tracking import iou
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def load_images(folder):
+    if folder is None:
+        from ultralytics.utils import ASSETS
+        folder = ASSETS
+    paths = sorted(p for p in Path(folder).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        raise SystemExit(f"No images found in {folder}")
+    return [cv2.imread(str(path)) for path in paths]
+
+
+def predict(model, frame):
+    """Boxes as (class id, confidence, [x1, y1, x2, y2]) above the API's 0.5 threshold"""
+    result = model(frame, verbose=False)[0]
+    detections = []
+    if result.boxes is not None:
+        for box in result.boxes:
+            confidence = float(box.conf[0])
+            if confidence > 0.5:
+                detections.append((int(box.cls[0]), confidence, [float(v) for v in box.xyxy[0]]))
+    return detections
+
+
+def agreement(reference, candidate, threshold=0.5):
+    """Precision and recall of candidate boxes against the reference, matched by class and IoU"""
+    matched = 0
+    used = set()
+    for class_id, _, box in reference:
+        for index, (other_class, _, other_box) in enumerate(candidate):
+            if index not in used and other_class == class_id and iou(box, other_box) >= threshold:
+                used.add(index)
+                matched += 1
+                break
+    precision = matched / len(candidate) if candidate else 1.0
+    recall = matched / len(reference) if reference else 1.0
+    return precision, recall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weights", default="yolov8n.pt")
+    parser.add_argument("--images")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    args = parser.parse_args()
+
+    if not Path(args.weights).exists():
+        raise SystemExit(f"Weights {args.weights} not found locally; this harness does not download")
+
+    buffers = FrameBuffers()
+    frames = [buffers.letterbox(image).copy() for image in load_images(args.images)]
+    reference = None
+
+    print(f"{'backend':<12} {'load s':>7} {'mean ms':>8} {'p95 ms':>8} {'precision':>10} {'recall':>7}")
+    for name in ["torch"] + [b for b in args.backends if b != "torch"]:
+        try:
+            start = time.perf_counter()
+            model = load_backend(name, args.weights, args.cache_dir)
+            load_s = time.perf_counter() - start
+            predict(model, frames[0])  # warm-up
+        except Exception as e:
+            print(f"{name:<12} unavailable: {e}")
+            continue
+
+        latencies = []
+        outputs = []
+        for frame in frames:
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                detections = predict(model, frame)
+                latencies.append((time.perf_counter() - start) * 1000)
+            outputs.append(detections)
+
+        if reference is None:
+            reference = outputs
+        scores = [agreement(ref, out) for ref, out in zip(reference, outputs)]
+        precision = np.mean([score[0] for score in scores])
+        recall = np.mean([score[1] for score in scores])
+        print(f"{name:<12} {load_s:7.2f} {np.mean(latencies):8.1f} {np.percentile(latencies, 95):8.1f} "
+              f"{precision:10.3f} {recall:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
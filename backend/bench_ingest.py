@@ -0,0 +1,71 @@
+"""Per-frame decode time and allocations: legacy PIL path vs cv2 ingest path.
+
+    python bench_ingest.py --iterations 50
+"""
+import argparse
+import base64
+import io
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from ingest import decode_base64_frame, frame_buffers
+
+
+def make_frame(width, height):
+    """Synthetic camera-like JPEG data URL"""
+    rng = np.random.default_rng(0)
+    image = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (15, 15), 0)
+    cv2.rectangle(image, (width // 4, height // 4), (width // 2, height // 2), (0, 200, 0), -1)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    return "data:image/jpeg;base64," + base64.b64encode(encoded.tobytes()).decode()
+
+
+def legacy_path(image_data):
+    """What analyze_frame and detect_objects_simple did before the ingest layer"""
+    if "base64," in image_data:
+        image_data = image_data.split("base64,")[1]
+    image = Image.open(io.BytesIO(base64.b64decode(image_data)))
+    img_array = np.array(image)
+    opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(opencv_image, cv2.COLOR_BGR2GRAY)
+    return img_array, gray
+
+
+def ingest_path(image_data):
+    image, _ = decode_base64_frame(image_data)
+    buffers = frame_buffers()
+    return buffers.letterbox(image), buffers.gray(image)
+
+
+def measure(fn, image_data, iterations):
+    fn(image_data)  # warm up buffers
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(image_data)
+    per_frame_ms = (time.perf_counter() - start) / iterations * 1000
+
+    tracemalloc.start()
+    fn(image_data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_frame_ms, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    for width, height in [(640, 480), (1920, 1080), (3840, 2160)]:
+        image_data = make_frame(width, height)
+        for name, fn in [("legacy", legacy_path), ("ingest", ingest_path)]:
+            per_frame_ms, peak_mb = measure(fn, image_data, args.iterations)
+            print(f"{width}x{height:<5} {name:<7} {per_frame_ms:7.2f} ms/frame  peak alloc {peak_mb:6.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
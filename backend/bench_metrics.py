@@ -0,0 +1,95 @@
+"""Per-frame cost of metrics instrumentation against the frame it instruments.
+
+Times, in one process, everything metrics adds to an analyze-frame request:
+seven stage() timers, the frame and fallback counters and the PROFILER.call
+hops around decode and detection. Rounds with metrics.ENABLED on and off are
+interleaved and the fastest round of each is kept, so scheduler noise and
+frequency drift fall out. That cost is compared with the fastest decode plus
+edge-detection fallback of a camera frame, the cheapest real frame the
+backend serves, and the script exits non-zero at 1% or more:
+
+    python bench_metrics.py --rounds 200 --iterations 1000
+"""
+import argparse
+import time
+
+import cv2
+
+import metrics
+from bench_ingest import make_frame
+from ingest import decode_base64, decode_frame, frame_buffers
+from metrics import PROFILER, stage
+
+# Stages one analyze-frame request passes through with a loaded model
+FRAME_STAGES = ("body_parse", "base64_decode", "image_decode",
+                "preprocess", "model_forward", "postprocess", "serialize")
+
+
+def no_work():
+    return None
+
+
+def instrumented_frame():
+    """The instrumentation of one frame wrapped around no work"""
+    metrics.FRAMES.inc("analyze_frame")
+    for name in FRAME_STAGES:
+        with stage(name):
+            pass
+    PROFILER.call(no_work)
+    PROFILER.call(no_work)
+    metrics.FALLBACKS.inc("no_model")
+
+
+def edge_frame(image_bytes):
+    """Decode plus the detect_objects_simple fallback, without any timers"""
+    image, _ = decode_frame(image_bytes)
+    edges = cv2.Canny(frame_buffers().gray(image), 50, 150)
+    return cv2.countNonZero(edges)
+
+
+def per_call(fn, iterations, *args):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(*args)
+    return (time.perf_counter() - start) / iterations
+
+
+def measure_overhead(rounds=200, iterations=1000, frame_rounds=50, width=640, height=480):
+    """Fastest seconds per frame of (instrumentation on, instrumentation off, frame work)"""
+    enabled = metrics.ENABLED
+    timings = {True: [], False: []}
+    try:
+        for round_index in range(rounds):
+            # Alternate which configuration goes first so drift affects both equally
+            for state in ((True, False) if round_index % 2 == 0 else (False, True)):
+                metrics.ENABLED = state
+                timings[state].append(per_call(instrumented_frame, iterations))
+    finally:
+        metrics.ENABLED = enabled
+
+    image_bytes = decode_base64(make_frame(width, height))
+    edge_frame(image_bytes)
+    frame = min(per_call(edge_frame, 1, image_bytes) for _ in range(frame_rounds))
+    return min(timings[True]), min(timings[False]), frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--budget", type=float, default=0.01)
+    args = parser.parse_args()
+
+    instrumented, baseline, frame = measure_overhead(args.rounds, args.iterations,
+                                                     width=args.width, height=args.height)
+    overhead = instrumented / frame
+    print(f"instrumentation on {instrumented * 1e6:.2f} us/frame, off {baseline * 1e6:.2f} us/frame, "
+          f"frame {frame * 1000:.3f} ms, overhead {overhead:.3%} (budget {args.budget:.0%})")
+    if overhead >= args.budget:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
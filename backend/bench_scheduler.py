@@ -0,0 +1,67 @@
+"""Throughput / p99 benchmark for the micro-batching scheduler.
+
+Runs on a CPU-only box with no model download by using StandInDetector:
+
+    python bench_scheduler.py --clients 32 --requests 20
+"""
+import argparse
+import asyncio
+import time
+
+from scheduler import InferenceScheduler, StandInDetector
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(max_batch_size, args):
+    detector = StandInDetector(args.overhead_ms, args.per_image_ms)
+    scheduler = InferenceScheduler(
+        detector,
+        max_batch_size=max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        max_queue_size=args.clients * 2,
+    )
+    await scheduler.start()
+    latencies = []
+
+    async def client():
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            await scheduler.submit(None)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    status = scheduler.status()
+    await scheduler.stop()
+
+    print(
+        f"batch<={max_batch_size:<3} "
+        f"{len(latencies) / elapsed:8.1f} frames/s  "
+        f"p50 {percentile(latencies, 50):7.1f} ms  "
+        f"p99 {percentile(latencies, 99):7.1f} ms  "
+        f"avg batch {status['avg_batch_size']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--overhead-ms", type=float, default=20)
+    parser.add_argument("--per-image-ms", type=float, default=2)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    for max_batch_size in args.batch_sizes:
+        asyncio.run(run(max_batch_size, args))
+
+
+if __name__ == "__main__":
+    main()
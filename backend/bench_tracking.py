@@ -0,0 +1,113 @@
+"""Skip ratio and tracking drift of motion-gated detection.
+
+Synthetic sequence with ground-truth boxes (no model needed):
+
+    python bench_tracking.py --frames 300
+
+Recorded footage, using per-frame detection as the reference:
+
+    python bench_tracking.py --video clip.mp4
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+from tracking import TrackingSession, iou
+
+FPS = 30
+
+
+def synthetic_sequence(frames, width=640, height=480, objects=3, seed=0):
+    """Textured objects drifting over a static textured background, with their true boxes"""
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(0, 120, (height, width, 3), dtype=np.uint8), (9, 9), 0)
+    sprites = []
+    for index in range(objects):
+        size = int(rng.integers(50, 90))
+        texture = cv2.GaussianBlur(rng.integers(140, 255, (size, size, 3), dtype=np.uint8), (3, 3), 0)
+        start = rng.uniform([0, 0], [width - size, height - size])
+        velocity = rng.uniform(-2.5, 2.5, size=2)
+        sprites.append((f"object-{index}", texture, start, velocity))
+
+    for frame_index in range(frames):
+        frame = background.copy()
+        truth = []
+        for name, texture, start, velocity in sprites:
+            size = texture.shape[0]
+            x, y = start + velocity * frame_index
+            # Bounce inside the frame
+            x = abs((x % (2 * (width - size))) - (width - size)) if width > size else 0
+            y = abs((y % (2 * (height - size))) - (height - size)) if height > size else 0
+            x, y = int(x), int(y)
+            frame[y:y + size, x:x + size] = texture
+            truth.append({"name": name, "confidence": 1.0, "box": [x, y, x + size, y + size]})
+        yield frame, truth
+
+
+def video_sequence(path, detect):
+    """Frames from a recording, with per-frame detections as the reference"""
+    capture = cv2.VideoCapture(path)
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            yield frame, detect(frame)
+    finally:
+        capture.release()
+
+
+def drift(tracked, reference):
+    """Mean IoU between tracked boxes and the reference boxes of the same class"""
+    scores = []
+    for expected in reference:
+        if expected.get("box") is None:
+            continue
+        candidates = [iou(t["box"], expected["box"]) for t in tracked
+                      if t.get("box") is not None and t["name"] == expected["name"]]
+        scores.append(max(candidates, default=0.0))
+    return scores
+
+
+def run(sequence, session):
+    skipped_scores = []
+    for index, (frame, reference) in enumerate(sequence):
+        if session.observe(frame, now=index / FPS):
+            session.update(reference)
+        else:
+            skipped_scores.extend(drift(session.detections(), reference))
+
+    stats = session.stats()
+    print(f"frames            {stats['frames']}")
+    print(f"keyframes         {stats['keyframes']}")
+    print(f"skip ratio        {stats['skip_ratio']:.1%}")
+    if skipped_scores:
+        print(f"mean IoU skipped  {np.mean(skipped_scores):.3f}")
+        print(f"p10 IoU skipped   {np.percentile(skipped_scores, 10):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--video")
+    parser.add_argument("--motion-threshold", type=float, default=0.02)
+    parser.add_argument("--max-keyframe-interval-s", type=float, default=2.0)
+    args = parser.parse_args()
+
+    session = TrackingSession(
+        motion_threshold=args.motion_threshold,
+        max_keyframe_interval_s=args.max_keyframe_interval_s,
+    )
+    if args.video:
+        import main as backend
+
+        backend.initialize_yolo()
+        sequence = video_sequence(args.video, lambda frame: backend.detect_boxes_batch([frame])[0])
+    else:
+        sequence = synthetic_sequence(args.frames)
+    run(sequence, session)
+
+
+if __name__ == "__main__":
+    main()
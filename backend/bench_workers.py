@@ -0,0 +1,76 @@
+"""Requests/s as the inference worker count grows, against in-process threads.
+
+Uses a GIL-holding stand-in detector by default, so no model is needed:
+
+    python bench_workers.py --max-workers 4
+
+Pass --factory main:load_local_detector to benchmark the configured real detector.
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from scheduler import InferenceScheduler, StandInDetector
+from worker_pool import WorkerPool, load_factory
+
+
+def make_detector():
+    """Stand-in whose cost is Python work holding the GIL, like eager inference glue"""
+    return StandInDetector(call_overhead_ms=10, per_image_ms=5, busy=True), "Stand-in", ["stand-in object"]
+
+
+async def drive(detect_batch, concurrency, args):
+    scheduler = InferenceScheduler(
+        detect_batch,
+        max_batch_size=args.batch_size,
+        max_wait_ms=5,
+        max_queue_size=args.clients * 2,
+        timeout_s=60,
+        concurrency=concurrency,
+    )
+    await scheduler.start()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    latencies = []
+
+    async def client():
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            await scheduler.submit(frame)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    await scheduler.stop()
+    return len(latencies) / elapsed, float(np.percentile(latencies, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=1, help="torch/OpenMP threads per worker")
+    parser.add_argument("--factory", default="bench_workers:make_detector")
+    args = parser.parse_args()
+
+    local_detect, _, _ = load_factory(args.factory)()
+    for count in range(1, args.max_workers + 1):
+        rps, p99 = asyncio.run(drive(local_detect, count, args))
+        print(f"threads   x{count}  {rps:8.1f} req/s  p99 {p99:8.1f} ms")
+
+        pool = WorkerPool(args.factory, workers=count, slots=args.batch_size * 2,
+                          threads=args.threads)
+        pool.start()
+        try:
+            rps, p99 = asyncio.run(drive(pool.detect_batch, count, args))
+        finally:
+            pool.stop()
+        print(f"processes x{count}  {rps:8.1f} req/s  p99 {p99:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
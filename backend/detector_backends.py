@@ -0,0 +1,130 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from ingest import MODEL_INPUT_SIZE
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".model_cache"
+
+
+def model_hash(weights):
+    """Short content hash of a weights file, so re-exports happen only when it changes"""
+    digest = hashlib.sha256()
+    with open(weights, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def resolve_weights(weights):
+    """Local path of the weights, letting ultralytics fetch its stock models if missing"""
+    if Path(weights).exists():
+        return weights
+    from ultralytics import YOLO
+    return YOLO(weights).ckpt_path
+
+
+def cached_artifact(weights, backend, suffix, cache_dir):
+    return Path(cache_dir) / f"{Path(weights).stem}-{model_hash(weights)}-{backend}{suffix}"
+
+
+def export_artifact(weights, export_format, target, **export_options):
+    """Export weights with ultralytics once, then reuse the cached file on later startups"""
+    if target.exists():
+        print(f"♻️ Using cached {export_format} model {target.name}")
+        return target
+
+    from ultralytics import YOLO
+    print(f"📦 Exporting {weights} to {export_format}...")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # ultralytics writes the export next to the weights, so each exporter works on its own copy
+    # and the finished file is renamed into place; concurrent exporters never see a partial file
+    with tempfile.TemporaryDirectory(dir=target.parent) as staging:
+        staged_weights = Path(staging) / Path(weights).name
+        shutil.copy2(weights, staged_weights)
+        exported = YOLO(str(staged_weights)).export(format=export_format, imgsz=MODEL_INPUT_SIZE,
+                                                    **export_options)
+        os.replace(exported, target)
+    return target
+
+
+def torchscript_artifact(weights, cache_dir):
+    return export_artifact(weights, "torchscript",
+                           cached_artifact(weights, "torchscript", ".torchscript", cache_dir))
+
+
+def onnx_artifact(weights, cache_dir):
+    return export_artifact(weights, "onnx",
+                           cached_artifact(weights, "onnx", ".onnx", cache_dir), dynamic=True)
+
+
+def int8_artifact(weights, cache_dir):
+    target = cached_artifact(weights, "onnx-int8", ".onnx", cache_dir)
+    if target.exists():
+        print(f"♻️ Using cached int8 model {target.name}")
+        return target
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    source = onnx_artifact(weights, cache_dir)
+    print(f"📦 Quantizing {source.name} to INT8...")
+    with tempfile.TemporaryDirectory(dir=target.parent) as staging:
+        staged = Path(staging) / target.name
+        quantize_dynamic(str(source), str(staged), weight_type=QuantType.QUInt8)
+        os.replace(staged, target)
+    return target
+
+
+def load_torch(weights, cache_dir):
+    """Eager PyTorch, the reference backend"""
+    from ultralytics import YOLO
+    return YOLO(weights)
+
+
+def load_torchscript(weights, cache_dir):
+    """Traced TorchScript graph, which skips Python module dispatch"""
+    from ultralytics import YOLO
+    return YOLO(str(torchscript_artifact(weights, cache_dir)), task="detect")
+
+
+def load_onnx(weights, cache_dir):
+    """ONNX Runtime session with a dynamic batch axis"""
+    from ultralytics import YOLO
+    return YOLO(str(onnx_artifact(weights, cache_dir)), task="detect")
+
+
+def load_int8(weights, cache_dir):
+    """ONNX Runtime session over dynamically quantized INT8 weights"""
+    from ultralytics import YOLO
+    return YOLO(str(int8_artifact(weights, cache_dir)), task="detect")
+
+
+BACKENDS = {
+    "torch": load_torch,
+    "torchscript": load_torchscript,
+    "onnx": load_onnx,
+    "int8": load_int8,
+}
+
+# Backends that load a file exported from the weights, keyed like BACKENDS
+ARTIFACTS = {
+    "torchscript": torchscript_artifact,
+    "onnx": onnx_artifact,
+    "int8": int8_artifact,
+}
+
+
+def load_backend(name, weights="yolov8n.pt", cache_dir=DEFAULT_CACHE_DIR):
+    """Load a YOLO model through the named backend; all backends share the ultralytics results API"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{name}', expected one of {sorted(BACKENDS)}")
+    if name != "torch":
+        weights = resolve_weights(weights)
+    return BACKENDS[name](weights, cache_dir)
+
+
+def prepare_backend(name, weights="yolov8n.pt", cache_dir=DEFAULT_CACHE_DIR):
+    """Export the backend's cached artifact without loading it, e.g. once before worker processes start"""
+    if name in ARTIFACTS:
+        ARTIFACTS[name](resolve_weights(weights), cache_dir)
@@ -0,0 +1,136 @@
+import base64
+import binascii
+import io
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Long side the detector resizes to; larger JPEGs are decoded at reduced scale
+MODEL_INPUT_SIZE = 640
+LETTERBOX_FILL = 114
+
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def read_image_size(image_bytes):
+    """Read width and height from the image header without decoding pixels"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as header:
+            return header.size, header.format
+    except Exception:
+        return None, None
+
+
+def reduction_factor(width, height, target_size=MODEL_INPUT_SIZE):
+    """Largest decode scale-down that keeps the long side at or above the model input"""
+    long_side = max(width, height)
+    for factor in (8, 4, 2):
+        if long_side // factor >= target_size:
+            return factor
+    return 1
+
+
+def decode_frame(image_bytes, target_size=MODEL_INPUT_SIZE):
+    """Decode JPEG/PNG bytes straight into a BGR array; returns (array, original (w, h))"""
+    size, image_format = read_image_size(image_bytes)
+    factor = 1
+    # Only JPEG decodes at reduced scale natively; other formats would decode then resize
+    if size and image_format == "JPEG" and target_size:
+        factor = reduction_factor(*size, target_size)
+
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    image = cv2.imdecode(buffer, REDUCED_DECODE_FLAGS[factor])
+    if image is None:
+        raise ValueError("Could not decode image")
+
+    if size is None:
+        size = (image.shape[1], image.shape[0])
+    elif (image.shape[1] < image.shape[0]) != (size[0] < size[1]):
+        # imdecode applies EXIF orientation, which the header size ignores
+        size = (size[1], size[0])
+    return image, size
+
+
+def decode_base64(image_data):
+    """Bytes of a base64 (optionally data-URL) image string"""
+    marker = image_data.find("base64,")
+    if marker != -1:
+        image_data = image_data[marker + len("base64,"):]
+    try:
+        return base64.b64decode(image_data)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64 image: {e}")
+
+
+def decode_base64_frame(image_data, target_size=MODEL_INPUT_SIZE):
+    """Decode a base64 (optionally data-URL) string into a BGR array"""
+    return decode_frame(decode_base64(image_data), target_size)
+
+
+def letterbox_transform(width, height, size=MODEL_INPUT_SIZE):
+    """Scale, resized width/height and (left, top) padding of a frame on the letterbox canvas"""
+    scale = size / max(height, width)
+    new_width = max(1, round(width * scale))
+    new_height = max(1, round(height * scale))
+    return scale, new_width, new_height, (size - new_width) // 2, (size - new_height) // 2
+
+
+class FrameBuffers:
+    """Preallocated per-worker buffers for letterboxing and grayscale conversion"""
+
+    def __init__(self, size=MODEL_INPUT_SIZE):
+        self.size = size
+        self.canvases = []
+        self.scratch = {}
+
+    def _buffer(self, key, shape):
+        buffer = self.scratch.get(key)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self.scratch[key] = buffer
+        return buffer
+
+    def _canvas(self, slot):
+        while len(self.canvases) <= slot:
+            self.canvases.append(np.empty((self.size, self.size, 3), dtype=np.uint8))
+        return self.canvases[slot]
+
+    def letterbox(self, image, slot=0):
+        """Resize into a square padded canvas; the result is reused by the next call on this slot"""
+        height, width = image.shape[:2]
+        _, new_width, new_height, left, top = letterbox_transform(width, height, self.size)
+
+        canvas = self._canvas(slot)
+        canvas.fill(LETTERBOX_FILL)
+        if (new_width, new_height) == (width, height):
+            canvas[top:top + new_height, left:left + new_width] = image
+        else:
+            resized = self._buffer(("resize", slot), (new_height, new_width, 3))
+            cv2.resize(image, (new_width, new_height), dst=resized, interpolation=cv2.INTER_LINEAR)
+            canvas[top:top + new_height, left:left + new_width] = resized
+        return canvas
+
+    def gray(self, image):
+        """BGR to grayscale into a reused buffer"""
+        gray = self._buffer("gray", image.shape[:2])
+        cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=gray)
+        return gray
+
+
+_worker_buffers = threading.local()
+
+
+def frame_buffers():
+    """FrameBuffers owned by the calling worker thread"""
+    buffers = getattr(_worker_buffers, "buffers", None)
+    if buffers is None:
+        buffers = FrameBuffers()
+        _worker_buffers.buffers = buffers
+    return buffers
@@ -1,13 +1,40 @@
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import torch
+from starlette.concurrency import run_in_threadpool
+# torch and transformers are not imported here: ultralytics pulls torch in when
+# the model loads in the background, and /ai/status reads versions from metadata
 import cv2
-import transformers
 import numpy as np
-import base64
-from PIL import Image
-import io
+import os
+import sys
+import json
+import asyncio
+import functools
+import itertools
+from pathlib import Path
 import uvicorn
+from scheduler import InferenceScheduler, QueueFullError, StandInDetector
+from streaming import FrameSession
+from ingest import decode_base64, decode_frame, frame_buffers, letterbox_transform
+from result_cache import ResultCache, perceptual_hash
+from worker_pool import WorkerPool
+from tracking import TrackingSessions
+from detector_backends import DEFAULT_CACHE_DIR, load_backend, prepare_backend
+from readiness import StartupTracker, package_version
+from video_analysis import DEFAULT_CHECKPOINT_DIR, VideoJob, error_line, frame_line
+import metrics
+from metrics import PROFILER, stage
+
+startup = StartupTracker(started=_import_started)
+startup.mark("imports", time.perf_counter() - _import_started)
+startup_task = None
+
+class DetectorNotReadyError(Exception):
+    """Raised for frames that arrive before the detector has loaded"""
 
 app = FastAPI()
 
@@ -22,55 +49,155 @@ app.add_middleware(
 
 # Global variable for YOLO model
 yolo_model = None
+yolo_backend = None
+
+# Detector configuration
+DETECTOR = os.environ.get("AI_DETECTOR", "yolo")
+DETECTOR_BACKEND = os.environ.get("AI_DETECTOR_BACKEND", "torch")
+MODEL_WEIGHTS = os.environ.get("AI_MODEL_WEIGHTS", "yolov8n.pt")
+MODEL_CACHE_DIR = os.environ.get("AI_MODEL_CACHE_DIR", str(DEFAULT_CACHE_DIR))
+
+# Micro-batching configuration
+MAX_BATCH_SIZE = int(os.environ.get("AI_MAX_BATCH_SIZE", "8"))
+MAX_WAIT_MS = float(os.environ.get("AI_MAX_WAIT_MS", "10"))
+MAX_QUEUE_SIZE = int(os.environ.get("AI_MAX_QUEUE_SIZE", "64"))
+REQUEST_TIMEOUT_S = float(os.environ.get("AI_REQUEST_TIMEOUT_S", "10"))
+
+# Inference worker pool configuration (0 workers runs detection in-process)
+WORKERS = int(os.environ.get("AI_WORKERS", "0"))
+WORKER_THREADS = int(os.environ.get("AI_WORKER_THREADS", "1"))
+WORKER_SLOT_MB = float(os.environ.get("AI_WORKER_SLOT_MB", "4"))
+
+# Near-duplicate frame cache configuration
+CACHE_ENABLED = os.environ.get("AI_CACHE_ENABLED", "1") == "1"
+CACHE_MAX_DISTANCE = int(os.environ.get("AI_CACHE_MAX_DISTANCE", "4"))
+# Must outlast the frontend's 3 s auto-analysis interval, or entries expire before the next frame
+CACHE_TTL_S = float(os.environ.get("AI_CACHE_TTL_S", "10"))
+CACHE_MAX_ENTRIES = int(os.environ.get("AI_CACHE_MAX_ENTRIES", "256"))
+CACHE_MAX_BYTES = int(os.environ.get("AI_CACHE_MAX_BYTES", str(1024 * 1024)))
+
+# Motion-gated tracking configuration
+TRACKING_ENABLED = os.environ.get("AI_TRACKING_ENABLED", "1") == "1"
+MOTION_THRESHOLD = float(os.environ.get("AI_MOTION_THRESHOLD", "0.02"))
+MAX_KEYFRAME_INTERVAL_S = float(os.environ.get("AI_MAX_KEYFRAME_INTERVAL_S", "2"))
+MAX_TRACKING_SESSIONS = int(os.environ.get("AI_MAX_TRACKING_SESSIONS", "64"))
+
+inference_scheduler = None
+worker_pool = None
+active_streams = set()
+active_video_jobs = set()
+stream_ids = itertools.count()
+result_cache = ResultCache(
+    max_distance=CACHE_MAX_DISTANCE,
+    ttl_s=CACHE_TTL_S,
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+) if CACHE_ENABLED else None
+tracking_sessions = TrackingSessions(
+    max_sessions=MAX_TRACKING_SESSIONS,
+    motion_threshold=MOTION_THRESHOLD,
+    max_keyframe_interval_s=MAX_KEYFRAME_INTERVAL_S,
+)
 
 def initialize_yolo():
     """Initialize YOLO model"""
-    global yolo_model
-    try:
-        from ultralytics import YOLO
-        yolo_model = YOLO('yolov8n.pt')
-        print("✅ YOLO model loaded successfully")
-        return True
-    except Exception as e:
-        print(f"❌ YOLO not available: {e}")
-        return False
+    global yolo_model, yolo_backend
+    backends = [DETECTOR_BACKEND] if DETECTOR_BACKEND == "torch" else [DETECTOR_BACKEND, "torch"]
+    for backend in backends:
+        try:
+            yolo_model = load_backend(backend, MODEL_WEIGHTS, MODEL_CACHE_DIR)
+            yolo_backend = backend
+            print(f"✅ YOLO model loaded successfully ({backend} backend)")
+            return True
+        except Exception as e:
+            print(f"❌ YOLO not available with {backend} backend: {e}")
+    return False
 
 def detect_objects_yolo(image):
     """YOLO object detection"""
+    return detect_objects_batch([image])[0]
+
+def detect_objects_batch(images):
+    """YOLO object detection over a batch, as labelled confidence strings"""
+    return [describe_detections(detections) for detections in detect_boxes_batch(images)]
+
+def detect_boxes_batch(images):
+    """YOLO object detection over a batch in a single forward pass"""
     global yolo_model
     
     if yolo_model is None:
-        return detect_objects_simple(image)
+        metrics.FALLBACKS.inc("no_model", len(images))
+        return [simple_detections(image) for image in images]
     
     try:
-        img_array = np.array(image)
-        results = yolo_model(img_array, verbose=False)
-        
-        detected_objects = []
-        
-        for result in results:
-            if result.boxes is not None:
-                for box in result.boxes:
-                    class_id = int(box.cls[0])
-                    confidence = float(box.conf[0])
-                    
-                    if confidence > 0.5:
-                        object_name = yolo_model.names[class_id]
-                        detected_objects.append(f"{object_name} ({confidence:.1%})")
-        
-        return detected_objects if detected_objects else ["No objects detected"]
+        with stage("preprocess"):
+            buffers = frame_buffers()
+            img_arrays = [buffers.letterbox(image, slot) for slot, image in enumerate(images)]
+        with stage("model_forward"):
+            results = yolo_model(img_arrays, verbose=False)
+        with stage("postprocess"):
+            return [format_detections(result, image) for result, image in zip(results, images)]
         
     except Exception as e:
         print(f"YOLO detection failed: {e}")
-        return detect_objects_simple(image)
+        metrics.ERRORS.inc("model")
+        metrics.FALLBACKS.inc("model_error", len(images))
+        return [simple_detections(image) for image in images]
+
+def format_detections(result, image):
+    """Convert one YOLO result into detections with boxes in frame coordinates"""
+    height, width = image.shape[:2]
+    scale, _, _, left, top = letterbox_transform(width, height)
+    detections = []
+    
+    if result.boxes is not None:
+        for box in result.boxes:
+            class_id = int(box.cls[0])
+            confidence = float(box.conf[0])
+            
+            if confidence > 0.5:
+                x1, y1, x2, y2 = (float(value) for value in box.xyxy[0])
+                detections.append({
+                    "name": yolo_model.names[class_id],
+                    "confidence": confidence,
+                    "box": [
+                        min(max((x1 - left) / scale, 0), width),
+                        min(max((y1 - top) / scale, 0), height),
+                        min(max((x2 - left) / scale, 0), width),
+                        min(max((y2 - top) / scale, 0), height),
+                    ]
+                })
+    
+    return detections
+
+def describe_detections(detections):
+    """Labelled confidence strings, e.g. "person (87.5%)" """
+    detected_objects = [
+        f"{d['name']} ({d['confidence']:.1%})" if d.get("confidence") is not None else d["name"]
+        for d in detections
+    ]
+    return detected_objects if detected_objects else ["No objects detected"]
+
+def scale_detections(detections, factor):
+    """Map boxes from the decoded frame back to the uploaded frame's resolution"""
+    scaled = []
+    for detection in detections:
+        box = detection.get("box")
+        if box is not None:
+            box = [round(float(value) * factor, 1) for value in box]
+        scaled.append({**detection, "box": box})
+    return scaled
+
+def simple_detections(image):
+    """Edge detection fallback as scene-level detections without boxes"""
+    return [{"name": name, "confidence": None, "box": None} for name in detect_objects_simple(image)]
 
 def detect_objects_simple(image):
     """Simple edge detection fallback"""
-    opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-    gray = cv2.cvtColor(opencv_image, cv2.COLOR_BGR2GRAY)
+    gray = frame_buffers().gray(image)
     edges = cv2.Canny(gray, 50, 150)
-    edge_pixels = np.sum(edges > 0)
-    
+    edge_pixels = cv2.countNonZero(edges)
+
     objects = []
     if edge_pixels > 10000:
         objects.append("Complex Scene")
@@ -78,47 +205,155 @@ def detect_objects_simple(image):
         objects.append("Objects Detected")
     else:
         objects.append("Simple Scene")
-    
+
     return objects
 
-# Initialize YOLO on startup
-@app.on_event("startup")
-async def startup_event():
-    print("🚀 Starting AI Assistant Backend...")
+def load_local_detector():
+    """Load the configured detector in this process; returns (detect_batch, method name, class names)"""
+    if DETECTOR == "standin":
+        print("🧪 Using stand-in detector (no model loaded)")
+        return StandInDetector(), "Stand-in", ["stand-in object"]
+    
     success = initialize_yolo()
     if success:
         print("✅ Advanced object detection ready")
     else:
-        print(⚠️ Using simple edge detection")
+        print("⚠️ Using simple edge detection")
+    return detect_boxes_batch, detection_method(), detection_classes()
+
+def create_scheduler(detect_batch, concurrency=1):
+    """Build the micro-batching scheduler in front of a detector"""
+    return InferenceScheduler(
+        functools.partial(PROFILER.call, detect_batch),
+        max_batch_size=MAX_BATCH_SIZE,
+        max_wait_ms=MAX_WAIT_MS,
+        max_queue_size=MAX_QUEUE_SIZE,
+        timeout_s=REQUEST_TIMEOUT_S,
+        concurrency=concurrency,
+    )
+
+def detection_method():
+    """Name of the detector serving analyze-frame requests"""
+    if worker_pool is not None and worker_pool.detection_method:
+        return worker_pool.detection_method
+    if DETECTOR == "standin":
+        return "Stand-in"
+    return "YOLO v8" if yolo_model else "Edge Detection"
+
+def detection_classes():
+    """Class names of the detector serving requests, which may live in a worker process"""
+    if worker_pool is not None and worker_pool.detection_method:
+        return worker_pool.detection_classes
+    return list(yolo_model.names.values()) if yolo_model else []
+
+# Unauthenticated profiling controls under /debug are only mounted when explicitly enabled
+DEBUG_ENDPOINTS = os.environ.get("AI_DEBUG_ENDPOINTS", "0") == "1"
+
+# Offline video analysis: paths are resolved under VIDEO_ROOT, checkpoints let interrupted jobs resume
+VIDEO_ROOT = Path(os.environ.get("AI_VIDEO_ROOT", os.getcwd())).resolve()
+VIDEO_CHECKPOINT_DIR = os.environ.get("AI_VIDEO_CHECKPOINT_DIR", str(DEFAULT_CHECKPOINT_DIR))
+VIDEO_QUEUE_SIZE = int(os.environ.get("AI_VIDEO_QUEUE_SIZE", "32"))
+VIDEO_PROGRESS_S = float(os.environ.get("AI_VIDEO_PROGRESS_S", "5"))
+
+# Initialize YOLO on startup
+@app.on_event("startup")
+async def startup_event():
+    global startup_task
+    print("🚀 Starting AI Assistant Backend...")
+    # Model loading runs in the background so "/" answers immediately; "/ready" tracks progress
+    startup_task = asyncio.create_task(prepare_detector())
+
+async def prepare_detector():
+    """Load the detector, start the scheduler and run one warm-up inference"""
+    global inference_scheduler, worker_pool
+    try:
+        startup.begin("loading")
+        if WORKERS > 0:
+            if DETECTOR == "yolo" and DETECTOR_BACKEND != "torch":
+                # Export once here rather than in every worker at the same moment
+                try:
+                    await run_in_threadpool(prepare_backend, DETECTOR_BACKEND, MODEL_WEIGHTS, MODEL_CACHE_DIR)
+                except Exception as e:
+                    print(f"❌ Could not prepare {DETECTOR_BACKEND} backend: {e}")
+            print(f"🧵 Starting {WORKERS} inference workers...")
+            worker_pool = WorkerPool(
+                "main:load_local_detector",
+                workers=WORKERS,
+                slots=MAX_BATCH_SIZE * 2,
+                slot_bytes=int(WORKER_SLOT_MB * 1024 * 1024),
+                threads=WORKER_THREADS,
+                job_timeout_s=REQUEST_TIMEOUT_S,
+            )
+            await run_in_threadpool(worker_pool.start)
+            scheduler = create_scheduler(worker_pool.detect_batch, concurrency=WORKERS)
+        else:
+            detect_batch, _, _ = await run_in_threadpool(load_local_detector)
+            scheduler = create_scheduler(detect_batch)
+        await scheduler.start()
+        inference_scheduler = scheduler
+        
+        startup.begin("warming")
+        await inference_scheduler.submit(np.zeros((480, 640, 3), dtype=np.uint8))
+        
+        startup.ready()
+        print(f"✅ Backend ready: {startup.status()['phases_s']}")
+    except Exception as e:
+        startup.fail(e)
+        print(f"❌ Startup failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if startup_task and not startup_task.done():
+        startup_task.cancel()
+    if inference_scheduler:
+        await inference_scheduler.stop()
+    if worker_pool:
+        await run_in_threadpool(worker_pool.stop)
 
 # API Endpoints
 @app.get("/")
 def health_check():
-    global yolo_model
-    model_status = "YOLO Ready" if yolo_model else "Simple Detection"
+    model_status = "YOLO Ready" if detection_method() == "YOLO v8" else "Simple Detection"
     return {
         "message": "AI Assistant Backend Online", 
         "status": "ready",
-        "detection_mode": model_status
+        "detection_mode": model_status,
+        "readiness": startup.state
     }
 
+@app.get("/ready")
+def readiness_check():
+    """Readiness probe: 200 once the detector is loaded and warmed up, 503 before"""
+    return JSONResponse(startup.status(), status_code=200 if startup.is_ready else 503)
+
+def torch_cuda_available():
+    """CUDA availability if torch is already loaded; never imports it just to answer"""
+    torch = sys.modules.get("torch")
+    return torch.cuda.is_available() if torch is not None else None
+
 @app.get("/ai/status")
 def ai_status():
     global yolo_model
     return {
-        "pytorch": torch.__version__,
+        "pytorch": package_version("torch"),
         "opencv": cv2.__version__,
-        "transformers": transformers.__version__,
-        "cuda": torch.cuda.is_available(),
-        "yolo_available": yolo_model is not None,
-        "detection_classes": len(yolo_model.names) if yolo_model else 0,
+        "transformers": package_version("transformers"),
+        "cuda": torch_cuda_available(),
+        "yolo_available": detection_method() == "YOLO v8",
+        "yolo_backend": yolo_backend or DETECTOR_BACKEND,
+        "detection_classes": len(detection_classes()),
+        "scheduler": inference_scheduler.status() if inference_scheduler else None,
+        "worker_pool": worker_pool.status() if worker_pool else None,
+        "active_streams": len(active_streams),
+        "cache": result_cache.status() if result_cache else None,
+        "tracking_sessions": len(tracking_sessions),
+        "startup": startup.status(),
         "message": "AI systems operational"
     }
 
 @app.get("/ai/test")
 def test_ai():
-    global yolo_model
-    mode = "Advanced YOLO" if yolo_model else "Basic Edge Detection"
+    mode = "Advanced YOLO" if detection_method() == "YOLO v8" else "Basic Edge Detection"
     return {
         "response": f"AI brain working with {mode}!", 
         "status": "success"
@@ -126,10 +361,8 @@ def test_ai():
 
 @app.get("/ai/capabilities")
 def get_capabilities():
-    global yolo_model
-    
-    if yolo_model:
-        detectable_objects = list(yolo_model.names.values())
+    if detection_method() == "YOLO v8":
+        detectable_objects = detection_classes()
         return {
             "detection_method": "YOLO v8",
             "total_classes": len(detectable_objects),
@@ -161,31 +394,171 @@ def get_capabilities():
             "note": "Install ultralytics for advanced object detection"
         }
 
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition of stage latencies, counters and queue gauges"""
+    samples = [
+        ("ai_ready", "gauge", "1 once the detector is loaded and warmed up", int(startup.is_ready)),
+        ("ai_active_streams", "gauge", "Open /ai/stream sessions", len(active_streams)),
+    ]
+    if inference_scheduler is not None:
+        status = inference_scheduler.status()
+        samples += [
+            ("ai_queue_depth", "gauge", "Frames waiting for a batch", status["queue_depth"]),
+            ("ai_inflight_batches", "gauge", "Batches currently running", status["inflight_batches"]),
+            ("ai_batches_total", "counter", "Batches run by the scheduler", status["batches"]),
+            ("ai_rejected_total", "counter", "Frames rejected with a full queue", status["rejected"]),
+        ]
+    if result_cache is not None:
+        status = result_cache.status()
+        samples += [
+            ("ai_cache_hits_total", "counter", "Result cache hits", status["hits"]),
+            ("ai_cache_misses_total", "counter", "Result cache misses", status["misses"]),
+            ("ai_cache_evictions_total", "counter", "Result cache evictions", status["evictions"]),
+        ]
+    return PlainTextResponse(metrics.render(samples), media_type="text/plain; version=0.0.4")
+
+if DEBUG_ENDPOINTS:
+    @app.get("/debug/profile")
+    def profile_report(limit: int = 30, sort: str = "cumulative"):
+        """Aggregated cProfile stats of sampled decode and detection calls"""
+        return PlainTextResponse(PROFILER.report(limit, sort))
+
+    @app.post("/debug/profile")
+    def configure_profile(rate: float = 0.0):
+        """Set the hot-path sampling rate (0 disables, 1 profiles every call) and clear collected samples"""
+        rate = max(0.0, min(rate, 1.0))
+        PROFILER.rate = rate
+        PROFILER.reset()
+        return {"status": "success", "sample_rate": rate}
+
+async def read_payload(request):
+    """Pull the image out of a JSON/base64, raw octet-stream or multipart body; returns (payload, is_base64)"""
+    content_type = request.headers.get("content-type", "")
+    
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("image")
+        if upload is None:
+            upload = next((value for value in form.values() if not isinstance(value, str)), None)
+        if upload is None:
+            raise ValueError("No image field in form data")
+        if isinstance(upload, str):
+            return upload, True
+        return await upload.read(), False
+    
+    if content_type.startswith("application/json") or not content_type:
+        body = await request.json()
+        return body.get("image", ""), True
+    
+    return await request.body(), False
+
+def decode_payload(payload, is_base64):
+    """Decode a request payload into a BGR frame, timing each decode stage"""
+    if is_base64:
+        with stage("base64_decode"):
+            payload = decode_base64(payload)
+    with stage("image_decode"):
+        return decode_frame(payload)
+
+async def read_frame(request):
+    """Decode the frame from a JSON/base64, raw octet-stream or multipart body"""
+    with stage("body_parse"):
+        payload, is_base64 = await read_payload(request)
+    return await run_in_threadpool(PROFILER.call, decode_payload, payload, is_base64)
+
+def cache_scope(client, image):
+    """Cache scope of a frame: cached boxes are only valid for the same client and decoded size"""
+    return client, image.shape
+
+def lookup_cache(scope, image):
+    """Hash a frame and look for a near-duplicate result"""
+    frame_hash = perceptual_hash(image)
+    return frame_hash, result_cache.get(scope, frame_hash)
+
+async def run_detection(image, client=None):
+    """Run detection through the result cache and batching scheduler; returns (detections, cached)
+
+    Frames without a client scope bypass the cache.
+    """
+    use_cache = result_cache is not None and client is not None
+    if use_cache:
+        scope = cache_scope(client, image)
+        frame_hash, cached_detections = await run_in_threadpool(lookup_cache, scope, image)
+        if cached_detections is not None:
+            return cached_detections, True
+    
+    if inference_scheduler is None:
+        raise DetectorNotReadyError(f"Detector is {startup.state}")
+    detections = await inference_scheduler.submit(image)
+    
+    if use_cache:
+        result_cache.put(scope, frame_hash, detections)
+    return detections, False
+
+async def analyze_image(image, tracker=None, client=None):
+    """Detect on every frame, or only on keyframes when a tracker is given; returns (detections, cached, keyframe)"""
+    if tracker is None:
+        detections, cached = await run_detection(image, client)
+        return detections, cached, True
+    
+    async with tracker.lock:
+        keyframe = await run_in_threadpool(tracker.observe, image)
+        cached = False
+        if keyframe:
+            detections, cached = await run_detection(image, client)
+            tracker.update(detections)
+        return tracker.detections(), cached, keyframe
+
+def detection_result(detections, image, width, height, cached, keyframe, tracker=None):
+    """Response fields shared by analyze-frame and the stream endpoint"""
+    detected_objects = describe_detections(detections)
+    result = {
+        "objects": detected_objects,
+        "object_count": len(detected_objects),
+        "detections": scale_detections(detections, width / image.shape[1]),
+        "detection_method": detection_method(),
+        "cached": cached,
+        "keyframe": keyframe,
+        "image_size": f"{width}x{height}",
+    }
+    if tracker is not None:
+        result["tracking"] = tracker.stats()
+    return result
+
 @app.post("/ai/analyze-frame")
-def analyze_frame(request: dict):
+async def analyze_frame(request: Request):
     """Analyze camera frame for object detection"""
+    metrics.FRAMES.inc("analyze_frame")
     try:
-        image_data = request.get("image", "")
-        
-        if "base64," in image_data:
-            image_data = image_data.split("base64,")[1]
-        
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(io.BytesIO(image_bytes))
+        image, (width, height) = await read_frame(request)
         
-        detected_objects = detect_objects_yolo(image)
+        # Frames tagged with a camera session id are tracked between keyframes
+        session_id = request.headers.get("x-session-id") or request.query_params.get("session_id")
+        tracker = tracking_sessions.get(session_id) if TRACKING_ENABLED and session_id else None
+        client = f"session:{session_id}" if session_id else f"client:{request.client.host if request.client else None}"
+        detections, cached, keyframe = await analyze_image(image, tracker, client)
+        result = detection_result(detections, image, width, height, cached, keyframe, tracker)
         
-        return {
-            "status": "success",
-            "objects": detected_objects,
-            "object_count": len(detected_objects),
-            "detection_method": "YOLO v8" if yolo_model else "Edge Detection",
-            "message": f"Analysis complete: {len(detected_objects)} objects found",
-            "image_size": f"{image.width}x{image.height}",
-            "timestamp": "real-time"
-        }
+        with stage("serialize"):
+            return JSONResponse({
+                "status": "success",
+                **result,
+                "message": f"Analysis complete: {result['object_count']} objects found",
+                "timestamp": "real-time"
+            })
         
+    except DetectorNotReadyError as e:
+        metrics.ERRORS.inc("not_ready")
+        raise HTTPException(status_code=503, detail=str(e))
+    except QueueFullError:
+        metrics.ERRORS.inc("queue_full")
+        raise HTTPException(status_code=503, detail="Inference queue is full, retry later")
+    except asyncio.TimeoutError:
+        metrics.ERRORS.inc("timeout")
+        raise HTTPException(status_code=504, detail="Inference timed out")
     except Exception as e:
+        metrics.ERRORS.inc("analysis")
         return {
             "status": "error",
             "objects": [],
@@ -193,5 +566,179 @@ def analyze_frame(request: dict):
             "detection_method": "error"
         }
 
+async def process_stream(websocket, session, tracker=None, stream_id=None):
+    """Run detection on the newest frame of a stream session and push results"""
+    while True:
+        frame = await session.take()
+        if frame is None:
+            return
+        frame_bytes, received_at = frame
+        metrics.FRAMES.inc("stream")
+        
+        try:
+            image, (width, height) = await run_in_threadpool(PROFILER.call, decode_payload, frame_bytes, False)
+            detections, cached, keyframe = await analyze_image(image, tracker, f"stream:{stream_id}")
+        except DetectorNotReadyError as e:
+            session.errors += 1
+            metrics.ERRORS.inc("not_ready")
+            await websocket.send_json({"type": "error", "message": str(e)})
+            continue
+        except QueueFullError:
+            session.errors += 1
+            metrics.ERRORS.inc("queue_full")
+            await websocket.send_json({"type": "error", "message": "Inference queue is full"})
+            continue
+        except asyncio.TimeoutError:
+            session.errors += 1
+            metrics.ERRORS.inc("timeout")
+            await websocket.send_json({"type": "error", "message": "Inference timed out"})
+            continue
+        except Exception as e:
+            session.errors += 1
+            metrics.ERRORS.inc("analysis")
+            await websocket.send_json({"type": "error", "message": f"Analysis failed: {str(e)}"})
+            continue
+        
+        latency_ms = session.record(received_at)
+        with stage("serialize"):
+            message = json.dumps({
+                "type": "result",
+                "status": "success",
+                **detection_result(detections, image, width, height, cached, keyframe, tracker),
+                "latency_ms": round(latency_ms, 1),
+                "stats": session.stats()
+            })
+        await websocket.send_text(message)
+
+def resolve_video_path(requested):
+    """Resolve a client-supplied path, refusing anything outside VIDEO_ROOT"""
+    if not requested:
+        raise ValueError("path is required")
+    path = (VIDEO_ROOT / requested).resolve()
+    if not path.is_relative_to(VIDEO_ROOT):
+        raise ValueError(f"path must be inside {VIDEO_ROOT}")
+    return path
+
+async def detect_video_frame(image):
+    """Offline frames wait for queue room instead of failing, since live traffic shares the scheduler"""
+    metrics.FRAMES.inc("analyze_video")
+    deadline = time.monotonic() + REQUEST_TIMEOUT_S
+    while True:
+        try:
+            # No client scope: bulk jobs skip the result cache so they cannot evict or borrow camera entries
+            return await run_detection(image)
+        except QueueFullError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(MAX_WAIT_MS / 1000)
+
+async def video_job_lines(job):
+    """Run a bulk job through the cache and scheduler, yielding result lines as each batch finishes"""
+    completed = False
+    try:
+        yield job.header()
+        job.start()
+        batches = job.batches()
+        last_progress = time.perf_counter()
+        while True:
+            batch = await run_in_threadpool(next, batches, None)
+            if batch is None:
+                completed = True
+                break
+            frames = [payload for kind, _, payload in batch if kind == "frame"]
+            try:
+                results = await asyncio.gather(*(detect_video_frame(frame.image) for frame in frames))
+            except Exception as e:
+                metrics.ERRORS.inc("analyze_video")
+                message = "Inference timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+                yield error_line(frames[0].source if frames else None, f"{message}; resume to continue")
+                break
+            
+            results = iter(results)
+            for kind, name, payload in batch:
+                if kind == "frame":
+                    detections, cached = next(results)
+                    width, height = payload.size
+                    yield frame_line(payload, detection_result(detections, payload.image, width, height, cached, True))
+                elif kind == "error":
+                    yield error_line(name, payload)
+            # The checkpoint write is file I/O, kept off the event loop like reading
+            await run_in_threadpool(job.record, batch)
+            
+            if time.perf_counter() - last_progress >= VIDEO_PROGRESS_S:
+                last_progress = time.perf_counter()
+                yield job.progress()
+        yield job.summary(completed)
+    finally:
+        active_video_jobs.discard(job.job_id)
+        await run_in_threadpool(job.close, completed)
+
+async def ndjson_lines(lines):
+    async for line in lines:
+        with stage("serialize"):
+            encoded = json.dumps(line) + "\n"
+        yield encoded
+
+@app.post("/ai/analyze-video")
+async def analyze_video(request: Request):
+    """Detect objects across a local video file or folder; per-frame results stream back as NDJSON"""
+    if inference_scheduler is None:
+        raise HTTPException(status_code=503, detail=f"Detector is {startup.state}")
+    
+    try:
+        body = await request.json()
+        if not isinstance(body, dict):
+            raise ValueError("body must be a JSON object")
+        sample_fps = body.get("sample_fps")
+        # Listing a large folder and reading the checkpoint would otherwise stall live requests
+        job = await run_in_threadpool(
+            VideoJob,
+            resolve_video_path(body.get("path")),
+            job_id=body.get("job_id"),
+            stride=int(body.get("stride", 1)),
+            sample_fps=float(sample_fps) if sample_fps else None,
+            batch_size=min(int(body.get("batch_size", MAX_BATCH_SIZE)), MAX_BATCH_SIZE),
+            resume=bool(body.get("resume", True)),
+            checkpoint_dir=VIDEO_CHECKPOINT_DIR,
+            queue_size=VIDEO_QUEUE_SIZE,
+        )
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Runs of one job share a checkpoint file; a retry or double submit is refused until the first ends
+    if job.job_id in active_video_jobs:
+        raise HTTPException(status_code=409, detail=f"Video job {job.job_id} is already running")
+    active_video_jobs.add(job.job_id)
+    return StreamingResponse(ndjson_lines(video_job_lines(job)), media_type="application/x-ndjson")
+
+@app.websocket("/ai/stream")
+async def stream_frames(websocket: WebSocket):
+    """Stream binary JPEG/PNG frames; stale frames are dropped while inference is busy"""
+    await websocket.accept()
+    session = FrameSession()
+    active_streams.add(session)
+    tracking = TRACKING_ENABLED and websocket.query_params.get("tracking", "1") == "1"
+    tracker = tracking_sessions.create() if tracking else None
+    processor = asyncio.create_task(process_stream(websocket, session, tracker, next(stream_ids)))
+    
+    try:
+        while not processor.done():
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                session.put(message["bytes"])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session.close()
+        processor.cancel()
+        try:
+            await processor
+        except (asyncio.CancelledError, Exception):
+            pass
+        active_streams.discard(session)
+        print(f"📴 Stream closed: {session.stats()}")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
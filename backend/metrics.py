@@ -0,0 +1,234 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = os.environ.get("AI_METRICS_ENABLED", "1") == "1"
+
+# Upper bounds in seconds; per-stage latencies range from microseconds (parsing) to seconds (forward)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and three additions under a lock"""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def export(self, reset=False):
+        with self.lock:
+            snapshot = (list(self.counts), self.sum, self.count)
+            if reset:
+                self.counts = [0] * len(self.counts)
+                self.sum = 0.0
+                self.count = 0
+        return snapshot
+
+    def merge(self, snapshot):
+        counts, total, count = snapshot
+        with self.lock:
+            for index, value in enumerate(counts):
+                self.counts[index] += value
+            self.sum += total
+            self.count += count
+
+
+class LabeledHistograms:
+    def __init__(self, name, help_text, label):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def get(self, value):
+        child = self.children.get(value)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(value, Histogram())
+        return child
+
+    def items(self):
+        # Copied under the lock: other threads add labels while /metrics is scraped
+        with self.lock:
+            return sorted(self.children.items())
+
+    def export(self, reset=False):
+        return {value: child.export(reset) for value, child in self.items()}
+
+    def merge(self, snapshots):
+        for value, snapshot in snapshots.items():
+            self.get(value).merge(snapshot)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for value, child in self.items():
+            counts, total, count = child.export()
+            cumulative = 0
+            for bound, bucket_count in zip(child.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{self.label}="{value}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{self.label}="{value}"}} {total}')
+            lines.append(f'{self.name}_count{{{self.label}="{value}"}} {count}')
+        return lines
+
+
+class LabeledCounters:
+    def __init__(self, name, help_text, label):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, value, amount=1):
+        if not ENABLED:
+            return
+        with self.lock:
+            self.values[value] = self.values.get(value, 0) + amount
+
+    def export(self, reset=False):
+        with self.lock:
+            snapshot = dict(self.values)
+            if reset:
+                self.values = {}
+        return snapshot
+
+    def merge(self, snapshot):
+        for value, amount in snapshot.items():
+            self.inc(value, amount)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for value, count in sorted(self.export().items()):
+            lines.append(f'{self.name}{{{self.label}="{value}"}} {count}')
+        return lines
+
+
+STAGE_SECONDS = LabeledHistograms(
+    "ai_frame_stage_seconds", "Time spent in each stage of the frame pipeline", "stage"
+)
+ERRORS = LabeledCounters("ai_errors_total", "Frame pipeline errors by kind", "kind")
+FALLBACKS = LabeledCounters(
+    "ai_detection_fallbacks_total", "Frames served by detect_objects_simple instead of YOLO", "reason"
+)
+FRAMES = LabeledCounters("ai_frames_total", "Frames analysed by entry point", "endpoint")
+
+
+class StageTimer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+def stage(name):
+    """Context manager timing one pipeline stage into ai_frame_stage_seconds"""
+    if not ENABLED:
+        return NULL_TIMER
+    return StageTimer(STAGE_SECONDS.get(name))
+
+
+def export_process(reset=True):
+    """Snapshot of metrics recorded in this process, for worker processes to ship to the API process"""
+    return {
+        "stages": STAGE_SECONDS.export(reset),
+        "errors": ERRORS.export(reset),
+        "fallbacks": FALLBACKS.export(reset),
+    }
+
+
+def merge_process(snapshot):
+    if not ENABLED:
+        return
+    STAGE_SECONDS.merge(snapshot["stages"])
+    ERRORS.merge(snapshot["errors"])
+    FALLBACKS.merge(snapshot["fallbacks"])
+
+
+def render(samples=()):
+    """Prometheus text exposition of all metrics plus (name, type, help, value) samples read at scrape time"""
+    lines = STAGE_SECONDS.render() + FRAMES.render() + ERRORS.render() + FALLBACKS.render()
+    for name, metric_type, help_text, value in samples:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """cProfile a random fraction of hot-path calls and aggregate the stats"""
+
+    def __init__(self, rate=0.0):
+        self.rate = rate
+        self.stats = None
+        self.samples = 0
+        self.lock = threading.Lock()
+        self.active = threading.Lock()
+
+    def call(self, fn, *args):
+        if self.rate <= 0 or random.random() >= self.rate or not self.active.acquire(blocking=False):
+            return fn(*args)
+        # One profiled call at a time; concurrent calls in other threads run unprofiled
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(fn, *args)
+        finally:
+            self.active.release()
+            with self.lock:
+                if self.stats is None:
+                    self.stats = pstats.Stats(profile)
+                else:
+                    self.stats.add(profile)
+                self.samples += 1
+
+    def reset(self):
+        with self.lock:
+            self.stats = None
+            self.samples = 0
+
+    def report(self, limit=30, sort="cumulative"):
+        with self.lock:
+            if self.stats is None:
+                return f"No samples yet (sample rate {self.rate})\n"
+            output = io.StringIO()
+            self.stats.stream = output
+            self.stats.sort_stats(sort).print_stats(limit)
+            return f"{self.samples} sampled calls (sample rate {self.rate})\n" + output.getvalue()
+
+
+PROFILER = SamplingProfiler(float(os.environ.get("AI_PROFILE_SAMPLE_RATE", "0")))
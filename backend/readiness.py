@@ -0,0 +1,59 @@
+import time
+from importlib import metadata
+
+
+def package_version(name):
+    """Installed version from package metadata, without importing the package"""
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+class StartupTracker:
+    """Startup state machine (starting -> loading -> warming -> ready | failed) with per-phase timings"""
+
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.state = "starting"
+        self.error = None
+        self.phases = {}
+        self.current = None
+        self.current_started = None
+
+    def mark(self, phase, seconds):
+        """Record a phase measured elsewhere, e.g. module imports"""
+        self.phases[phase] = round(seconds, 3)
+
+    def begin(self, state):
+        self.finish()
+        self.state = state
+        self.current = state
+        self.current_started = time.perf_counter()
+
+    def finish(self):
+        if self.current is not None:
+            self.mark(self.current, time.perf_counter() - self.current_started)
+            self.current = None
+
+    def ready(self):
+        self.finish()
+        self.state = "ready"
+        self.mark("total", time.perf_counter() - self.started)
+
+    def fail(self, error):
+        self.finish()
+        self.state = "failed"
+        self.error = str(error)
+
+    @property
+    def is_ready(self):
+        return self.state == "ready"
+
+    def status(self):
+        status = {"state": self.state, "phases_s": dict(self.phases)}
+        if self.current is not None:
+            status["current_phase_s"] = round(time.perf_counter() - self.current_started, 3)
+        if self.error:
+            status["error"] = self.error
+        return status
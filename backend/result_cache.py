@@ -0,0 +1,113 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+HASH_SIZE = 8
+
+
+def perceptual_hash(image):
+    """64-bit difference hash of a BGR frame, computed on a 9x8 grayscale thumbnail"""
+    small = cv2.resize(image, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def result_size(result):
+    """Rough memory footprint of a cached detection list"""
+    size = sys.getsizeof(result)
+    for detection in result:
+        size += sys.getsizeof(detection) + sum(sys.getsizeof(value) for value in detection.values())
+    return size
+
+
+class ResultCache:
+    """Near-duplicate frame cache with LRU order, TTL expiry and a memory cap
+
+    Entries are keyed by (scope, frame hash). The scope holds the client and the
+    decoded frame shape, because cached boxes are in that frame's pixel
+    coordinates and one client's results must not answer another's frames.
+    """
+
+    def __init__(self, max_distance=4, ttl_s=10.0, max_entries=256, max_bytes=1024 * 1024):
+        self.max_distance = max_distance
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def _remove(self, key):
+        _, _, size = self.entries.pop(key)
+        self.total_bytes -= size
+
+    def _expire(self, now):
+        # Hits do not refresh the timestamp, so a static scene is re-detected every ttl_s
+        for key in [key for key, (_, stored, _) in self.entries.items() if now - stored > self.ttl_s]:
+            self._remove(key)
+            self.stats["expired"] += 1
+
+    def get(self, scope, frame_hash):
+        """Cached detections for a frame in the same scope within max_distance bits, or None"""
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+
+            if (scope, frame_hash) in self.entries:
+                match = (scope, frame_hash)
+            else:
+                match = None
+                best = self.max_distance + 1
+                for key in self.entries:
+                    if key[0] != scope:
+                        continue
+                    distance = hamming_distance(key[1], frame_hash)
+                    if distance < best:
+                        match, best = key, distance
+
+            if match is None:
+                self.stats["misses"] += 1
+                return None
+
+            self.entries.move_to_end(match)
+            self.stats["hits"] += 1
+            return self.entries[match][0]
+
+    def put(self, scope, frame_hash, result):
+        key = (scope, frame_hash)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            size = result_size(result)
+            self.entries[key] = (result, time.monotonic(), size)
+            self.total_bytes += size
+
+            while self.entries and (
+                len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self.entries)))
+                self.stats["evictions"] += 1
+
+    def status(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0,
+            "max_distance": self.max_distance,
+            "ttl_s": self.ttl_s,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
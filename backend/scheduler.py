@@ -0,0 +1,169 @@
+import asyncio
+import time
+
+
+class QueueFullError(Exception):
+    """Raised when the inference queue is at capacity"""
+
+
+class InferenceScheduler:
+    """Collects concurrent frames into micro-batches for one forward pass"""
+
+    def __init__(self, detect_batch, max_batch_size=8, max_wait_ms=10,
+                 max_queue_size=64, timeout_s=10.0, concurrency=1):
+        self.detect_batch = detect_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queue_size = max_queue_size
+        self.timeout_s = timeout_s
+        self.concurrency = concurrency
+        self.queue = None
+        self.worker = None
+        self.inflight = set()
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "batches": 0,
+            "largest_batch": 0,
+        }
+
+    async def start(self):
+        """Start the batching loop on the running event loop"""
+        if self.worker is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching loop and fail anything still queued"""
+        if self.worker is None:
+            return
+        self.worker.cancel()
+        for task in list(self.inflight):
+            task.cancel()
+        await asyncio.gather(self.worker, *self.inflight, return_exceptions=True)
+        self.worker = None
+        while not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Scheduler stopped"))
+
+    async def submit(self, image):
+        """Queue one frame and wait for its detections"""
+        if self.worker is None:
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((image, future))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise QueueFullError("Inference queue is full")
+
+        self.stats["submitted"] += 1
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise
+
+    async def _collect(self):
+        """Wait for one frame, then gather more until the batch fills or the wait expires"""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Requests that timed out while queued are not worth a forward pass
+        return [(image, future) for image, future in batch if not future.done()]
+
+    async def _run(self):
+        # One batch per free slot, so several batches can be in flight when a pool backs detect_batch
+        slots = asyncio.Semaphore(self.concurrency)
+        while True:
+            await slots.acquire()
+            batch = await self._collect()
+            if not batch:
+                slots.release()
+                continue
+
+            task = asyncio.create_task(self._process(batch))
+            self.inflight.add(task)
+            task.add_done_callback(self.inflight.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _process(self, batch):
+        images = [image for image, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(None, self.detect_batch, images)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+                self.stats["completed"] += 1
+
+    def status(self):
+        """Current queue depth, limits and counters"""
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_queue_size": self.max_queue_size,
+            "inflight_batches": len(self.inflight),
+            "avg_batch_size": round(self.stats["completed"] / batches, 2) if batches else 0,
+        }
+
+
+class StandInDetector:
+    """Model-free detector with a fixed per-call cost plus a per-image cost"""
+
+    names = {0: "stand-in object"}
+
+    def __init__(self, call_overhead_ms=20.0, per_image_ms=2.0, busy=False):
+        self.call_overhead_ms = call_overhead_ms
+        self.per_image_ms = per_image_ms
+        # Busy mode does a fixed amount of GIL-holding Python work, like eager inference glue;
+        # sleeping releases the GIL and would make threads look as good as processes
+        self.busy = busy
+        self.loops_per_ms = self._calibrate() if busy else 0
+
+    @staticmethod
+    def _calibrate(loops=1000000):
+        # CPU time, so calibrating while other processes compete for the core is not skewed
+        start = time.process_time()
+        for _ in range(loops):
+            pass
+        return loops / max((time.process_time() - start) * 1000, 1e-3)
+
+    def detect(self, image):
+        box = None
+        if image is not None:
+            height, width = image.shape[:2]
+            box = [width / 4, height / 4, width / 2, height / 2]
+        return [{"name": self.names[0], "confidence": 0.99, "box": box}]
+
+    def __call__(self, images):
+        cost_s = (self.call_overhead_ms + self.per_image_ms * len(images)) / 1000
+        if self.busy:
+            for _ in range(int(cost_s * 1000 * self.loops_per_ms)):
+                pass
+        else:
+            time.sleep(cost_s)
+        return [self.detect(image) for image in images]
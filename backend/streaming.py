@@ -0,0 +1,59 @@
+import asyncio
+import time
+from collections import deque
+
+
+class FrameSession:
+    """Per-connection frame slot where the newest frame replaces any unprocessed one"""
+
+    def __init__(self, latency_window=100):
+        self.latest = None
+        self.frame_ready = asyncio.Event()
+        self.closed = False
+        self.latencies_ms = deque(maxlen=latency_window)
+        self.started = time.monotonic()
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.errors = 0
+
+    def put(self, frame_bytes):
+        """Store a frame, dropping the previous one if inference has not picked it up"""
+        self.frames_received += 1
+        if self.latest is not None:
+            self.frames_dropped += 1
+        self.latest = (frame_bytes, time.perf_counter())
+        self.frame_ready.set()
+
+    async def take(self):
+        """Wait for the newest frame; returns None once the session is closed"""
+        while self.latest is None:
+            if self.closed:
+                return None
+            self.frame_ready.clear()
+            await self.frame_ready.wait()
+        frame, self.latest = self.latest, None
+        return frame
+
+    def close(self):
+        self.closed = True
+        self.frame_ready.set()
+
+    def record(self, received_at):
+        """Count a processed frame and its receive-to-send latency"""
+        self.frames_processed += 1
+        latency_ms = (time.perf_counter() - received_at) * 1000
+        self.latencies_ms.append(latency_ms)
+        return latency_ms
+
+    def stats(self):
+        latencies = self.latencies_ms
+        return {
+            "frames_received": self.frames_received,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "errors": self.errors,
+            "avg_latency_ms": round(sum(latencies) / len(latencies), 1) if latencies else 0,
+            "max_latency_ms": round(max(latencies), 1) if latencies else 0,
+            "uptime_s": round(time.monotonic() - self.started, 1),
+        }
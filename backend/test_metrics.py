@@ -0,0 +1,13 @@
+import metrics
+from bench_metrics import measure_overhead
+
+
+def test_instrumentation_costs_under_one_percent_of_a_frame():
+    instrumented, _, frame = measure_overhead(rounds=50, iterations=500)
+    assert instrumented / frame < 0.01
+
+
+def test_measurement_restores_enabled_flag():
+    enabled = metrics.ENABLED
+    measure_overhead(rounds=2, iterations=10, frame_rounds=2)
+    assert metrics.ENABLED is enabled
@@ -0,0 +1,22 @@
+import numpy as np
+
+from tracking import TrackingSession
+
+
+def frame(width, height, seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+def test_resolution_change_mid_session_forces_keyframe_and_drops_tracks():
+    session = TrackingSession()
+    assert session.observe(frame(640, 480), now=0.0)
+    session.update([{"name": "person", "confidence": 0.9, "box": [100, 100, 200, 200]}])
+    assert not session.observe(frame(640, 480), now=0.1)
+
+    # Camera switch or device rotation
+    assert session.observe(frame(480, 640), now=0.2)
+    assert session.detections() == []
+    session.update([{"name": "cup", "confidence": 0.8, "box": [10, 10, 50, 50]}])
+
+    assert not session.observe(frame(480, 640), now=0.3)
+    assert [d["name"] for d in session.detections()] == ["cup"]
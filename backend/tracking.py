@@ -0,0 +1,212 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Frames are compared at this long side; motion and flow do not need full resolution
+MOTION_SIZE = 320
+GRID_POINTS = 5
+
+
+def iou(a, b):
+    """Intersection over union of two [x1, y1, x2, y2] boxes"""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def small_gray(image):
+    """Downscaled grayscale copy used for motion scoring and box propagation"""
+    height, width = image.shape[:2]
+    scale = min(1.0, MOTION_SIZE / max(height, width))
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA), scale
+
+
+def motion_score(previous, current):
+    """Fraction of pixels whose intensity changed noticeably between two frames"""
+    if previous is None or previous.shape != current.shape:
+        return 1.0
+    diff = cv2.absdiff(previous, current)
+    return cv2.countNonZero(cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)[1]) / diff.size
+
+
+def propagate_box(previous, current, box, scale):
+    """Shift a box by the median Lucas-Kanade flow of a point grid inside it"""
+    x1, y1, x2, y2 = (value * scale for value in box)
+    xs = np.linspace(x1, x2, GRID_POINTS + 2)[1:-1]
+    ys = np.linspace(y1, y2, GRID_POINTS + 2)[1:-1]
+    points = np.array([[x, y] for y in ys for x in xs], dtype=np.float32).reshape(-1, 1, 2)
+
+    moved, status, _ = cv2.calcOpticalFlowPyrLK(previous, current, points, None)
+    tracked = status.reshape(-1) == 1
+    if not tracked.any():
+        return box, False
+
+    dx, dy = np.median((moved - points).reshape(-1, 2)[tracked], axis=0) / scale
+    return [box[0] + dx, box[1] + dy, box[2] + dx, box[3] + dy], True
+
+
+class Track:
+    def __init__(self, track_id, detection):
+        self.track_id = track_id
+        self.name = detection["name"]
+        self.confidence = detection["confidence"]
+        self.box = detection["box"]
+        self.missed = 0
+
+    def to_dict(self):
+        return {
+            "track_id": self.track_id,
+            "name": self.name,
+            "confidence": self.confidence,
+            "box": [round(float(value), 1) for value in self.box],
+        }
+
+
+class TrackingSession:
+    """Runs detection only on keyframes and carries tracks forward in between"""
+
+    def __init__(self, motion_threshold=0.02, max_keyframe_interval_s=2.0,
+                 iou_threshold=0.3, max_missed=2):
+        self.motion_threshold = motion_threshold
+        self.max_keyframe_interval_s = max_keyframe_interval_s
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.tracks = []
+        self.scene = []
+        self.next_id = 1
+        self.previous_gray = None
+        self.frame_shape = None
+        self.keyframe_gray = None
+        self.last_keyframe = None
+        self.pending_keyframe = None
+        self.frames = 0
+        self.keyframes = 0
+        self.lost_points = 0
+        # Held across observe, detection and update so requests sharing a session id take turns
+        self.lock = asyncio.Lock()
+
+    def observe(self, image, now=None):
+        """Score motion and propagate tracks; returns True if this frame needs full detection
+
+        A keyframe only counts once update() receives its detections, so if
+        detection fails the next frame is a keyframe again.
+        """
+        now = time.monotonic() if now is None else now
+        gray, scale = small_gray(image)
+        self.frames += 1
+
+        # A camera switch or rotation changes the frame size; boxes from the old frames mean
+        # nothing in the new ones and optical flow cannot compare differently sized images
+        resized = self.frame_shape is not None and self.frame_shape != image.shape[:2]
+        if resized:
+            self.tracks = []
+            self.previous_gray = None
+        self.frame_shape = image.shape[:2]
+
+        keyframe = (
+            resized
+            or self.last_keyframe is None
+            or now - self.last_keyframe >= self.max_keyframe_interval_s
+            or motion_score(self.keyframe_gray, gray) > self.motion_threshold
+        )
+
+        # Tracks follow keyframes too, so they stay current when detection on one fails
+        if self.previous_gray is not None:
+            for track in self.tracks:
+                track.box, ok = propagate_box(self.previous_gray, gray, track.box, scale)
+                if not ok:
+                    self.lost_points += 1
+
+        self.previous_gray = gray
+        self.pending_keyframe = (gray, now) if keyframe else None
+        return keyframe
+
+    def update(self, detections):
+        """Associate keyframe detections with existing tracks by class and IoU"""
+        if self.pending_keyframe is not None:
+            self.keyframe_gray, self.last_keyframe = self.pending_keyframe
+            self.pending_keyframe = None
+            self.keyframes += 1
+        boxed = [d for d in detections if d.get("box") is not None]
+        self.scene = [d for d in detections if d.get("box") is None]
+
+        pairs = sorted(
+            (
+                (iou(track.box, detection["box"]), t, d)
+                for t, track in enumerate(self.tracks)
+                for d, detection in enumerate(boxed)
+                if track.name == detection["name"]
+            ),
+            key=lambda pair: pair[0],
+            reverse=True,
+        )
+
+        matched_tracks, matched_detections = set(), set()
+        for overlap, t, d in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in matched_tracks or d in matched_detections:
+                continue
+            track = self.tracks[t]
+            track.box = boxed[d]["box"]
+            track.confidence = boxed[d]["confidence"]
+            track.missed = 0
+            matched_tracks.add(t)
+            matched_detections.add(d)
+
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        for d, detection in enumerate(boxed):
+            if d not in matched_detections:
+                self.tracks.append(Track(self.next_id, detection))
+                self.next_id += 1
+
+    def detections(self):
+        """Current tracks, plus scene-level labels, in detection-dict form"""
+        live = [track.to_dict() for track in self.tracks if track.missed == 0]
+        return live + self.scene
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "keyframes": self.keyframes,
+            "skip_ratio": round(1 - self.keyframes / self.frames, 3) if self.frames else 0,
+            "active_tracks": len(self.tracks),
+            "lost_propagations": self.lost_points,
+        }
+
+
+class TrackingSessions:
+    """Bounded LRU map of camera session id to TrackingSession"""
+
+    def __init__(self, max_sessions=64, **session_options):
+        self.max_sessions = max_sessions
+        self.session_options = session_options
+        self.sessions = OrderedDict()
+
+    def create(self):
+        """New session with the shared options, not registered under an id"""
+        return TrackingSession(**self.session_options)
+
+    def get(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.create()
+            self.sessions[session_id] = session
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def __len__(self):
+        return len(self.sessions)
@@ -0,0 +1,394 @@
+"""Bulk detection over a local video file or a folder of videos and images.
+
+Results are written as NDJSON, one line per sampled frame, then a summary
+line with throughput. Interrupted jobs resume from their checkpoint:
+
+    python video_analysis.py footage/ --stride 5 --output results.ndjson
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2
+
+from ingest import MODEL_INPUT_SIZE
+
+VIDEO_SUFFIXES = {".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v", ".mpg", ".mpeg"}
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+DEFAULT_CHECKPOINT_DIR = Path(__file__).resolve().parent / ".video_jobs"
+
+
+class Frame:
+    __slots__ = ("source", "index", "time_s", "image", "size")
+
+    def __init__(self, source, index, time_s, image, size):
+        self.source = source
+        self.index = index
+        self.time_s = time_s
+        self.image = image
+        self.size = size
+
+
+def list_sources(path):
+    """Videos and images under a path in a stable order, as (relative name, path) pairs"""
+    path = Path(path)
+    if path.is_file():
+        return [(path.name, path)]
+    if not path.is_dir():
+        raise ValueError(f"{path} is not a file or directory")
+    sources = [
+        (child.relative_to(path).as_posix(), child)
+        for child in sorted(path.rglob("*"))
+        if child.is_file() and child.suffix.lower() in VIDEO_SUFFIXES | IMAGE_SUFFIXES
+    ]
+    if not sources:
+        raise ValueError(f"No videos or images found in {path}")
+    return sorted(sources)
+
+
+def job_id_for(path, stride, sample_fps):
+    """Deterministic id so re-submitting the same job picks up its checkpoint"""
+    key = f"{Path(path).resolve()}|{stride}|{sample_fps}"
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def fit_to_model(image, target_size=MODEL_INPUT_SIZE):
+    """Downscale a decoded frame so its long side matches the model input"""
+    height, width = image.shape[:2]
+    long_side = max(width, height)
+    if long_side <= target_size:
+        return image
+    scale = target_size / long_side
+    return cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+class Checkpoint:
+    """Position of a job in its ordered source list, saved atomically after every batch"""
+
+    def __init__(self, path, resume=True):
+        self.path = Path(path)
+        self.source = None
+        self.next_frame = 0
+        self.source_done = False
+        self.frames_analyzed = 0
+        if resume and self.path.exists():
+            with open(self.path) as handle:
+                state = json.load(handle)
+            self.source = state["source"]
+            self.next_frame = state["next_frame"]
+            self.source_done = state["source_done"]
+            self.frames_analyzed = state["frames_analyzed"]
+
+    def start_frame(self, source):
+        """First frame index to read from a source, or None if it was already finished"""
+        if self.source is None or source > self.source:
+            return 0
+        if source < self.source or self.source_done:
+            return None
+        return self.next_frame
+
+    def advance(self, source, next_frame):
+        self.source = source
+        self.next_frame = next_frame
+        self.source_done = False
+
+    def finish(self, source):
+        self.source = source
+        self.source_done = True
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(".tmp")
+        with open(temporary, "w") as handle:
+            json.dump({
+                "source": self.source,
+                "next_frame": self.next_frame,
+                "source_done": self.source_done,
+                "frames_analyzed": self.frames_analyzed,
+            }, handle)
+        os.replace(temporary, self.path)
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+
+    def position(self):
+        if self.source is None:
+            return None
+        return {"source": self.source, "next_frame": self.next_frame, "source_done": self.source_done}
+
+
+class FrameReader:
+    """Producer thread decoding sampled frames into a bounded queue, so memory is flat for any video length"""
+
+    def __init__(self, sources, checkpoint, stride=1, sample_fps=None, queue_size=32):
+        self.sources = sources
+        self.checkpoint = checkpoint
+        self.stride = max(1, stride)
+        self.sample_fps = sample_fps
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="frame-reader", daemon=True)
+        self.frames_decoded = 0
+        self.frames_skipped = 0
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        """Stop the producer; queued frames are dropped"""
+        self.stopping.set()
+        while self.thread.is_alive():
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                self.thread.join(timeout=0.1)
+        # Wake a consumer still blocked in batches()
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _put(self, item):
+        while not self.stopping.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            for name, path in self.sources:
+                start = self.checkpoint.start_frame(name)
+                if start is None:
+                    continue
+                if path.suffix.lower() in IMAGE_SUFFIXES:
+                    finished = start > 0 or self._read_image(name, path)
+                else:
+                    finished = self._read_video(name, path, start)
+                if not finished or not self._put(("done", name, None)):
+                    return
+        except Exception as e:
+            self._put(("error", None, f"{type(e).__name__}: {e}"))
+        finally:
+            self._put(None)
+
+    def _read_image(self, name, path):
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is None:
+            return self._put(("error", name, "Could not decode image"))
+        self.frames_decoded += 1
+        size = (image.shape[1], image.shape[0])
+        return self._put(("frame", name, Frame(name, 0, None, fit_to_model(image), size)))
+
+    def _read_video(self, name, path, start):
+        capture = cv2.VideoCapture(str(path))
+        try:
+            if not capture.isOpened():
+                return self._put(("error", name, "Could not open video"))
+            fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+            stride = self.stride
+            if self.sample_fps and fps > 0:
+                stride = max(1, round(fps / self.sample_fps))
+
+            index = 0
+            if start > 0:
+                # Container seeks can land on a nearby keyframe; rewind if it overshot, then grab() forward
+                if capture.set(cv2.CAP_PROP_POS_FRAMES, start):
+                    index = int(capture.get(cv2.CAP_PROP_POS_FRAMES))
+                    if index > start:
+                        capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        index = 0
+                while index < start and capture.grab():
+                    index += 1
+
+            while not self.stopping.is_set():
+                if index % stride:
+                    # grab() demuxes without decoding pixels, which is most of the cost of skipped frames
+                    if not capture.grab():
+                        return True
+                    self.frames_skipped += 1
+                    index += 1
+                    continue
+                ok, image = capture.read()
+                if not ok:
+                    return True
+                self.frames_decoded += 1
+                size = (image.shape[1], image.shape[0])
+                time_s = round(index / fps, 3) if fps > 0 else None
+                if not self._put(("frame", name, Frame(name, index, time_s, fit_to_model(image), size))):
+                    return False
+                index += 1
+            return False
+        finally:
+            capture.release()
+
+    def batches(self, batch_size):
+        """Blocking iterator of lists of queued items holding at most batch_size frames"""
+        while True:
+            batch = []
+            frames = 0
+            while frames < batch_size:
+                item = self.queue.get()
+                if item is None:
+                    if batch:
+                        yield batch
+                    return
+                batch.append(item)
+                if item[0] == "frame":
+                    frames += 1
+            yield batch
+
+
+class VideoJob:
+    """One bulk analysis run: reader, checkpoint and throughput counters"""
+
+    def __init__(self, path, job_id=None, stride=1, sample_fps=None, batch_size=8,
+                 resume=True, checkpoint_dir=DEFAULT_CHECKPOINT_DIR, queue_size=32):
+        if job_id is not None and not re.fullmatch(r"[\w-]{1,64}", job_id):
+            raise ValueError("job_id may only contain letters, digits, '_' and '-'")
+        self.path = Path(path)
+        self.sources = list_sources(self.path)
+        self.job_id = job_id or job_id_for(self.path, stride, sample_fps)
+        # A batch is held in memory and emits nothing until it fills, so it never exceeds the reader queue
+        self.batch_size = min(max(1, batch_size), queue_size)
+        self.checkpoint = Checkpoint(Path(checkpoint_dir) / f"{self.job_id}.json", resume)
+        self.resumed_from = self.checkpoint.position()
+        self.reader = FrameReader(self.sources, self.checkpoint, stride, sample_fps, queue_size)
+        self.frames_analyzed = 0
+        self.errors = 0
+        self.started = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.reader.start()
+        return self
+
+    def batches(self):
+        return self.reader.batches(self.batch_size)
+
+    def record(self, batch):
+        """Move the checkpoint past a batch whose results have been emitted"""
+        for kind, name, payload in batch:
+            if kind == "frame":
+                self.frames_analyzed += 1
+                self.checkpoint.frames_analyzed += 1
+                self.checkpoint.advance(name, payload.index + 1)
+            elif kind == "done":
+                self.checkpoint.finish(name)
+            elif kind == "error":
+                self.errors += 1
+                if name is not None:
+                    self.checkpoint.finish(name)
+        self.checkpoint.save()
+
+    def close(self, completed):
+        """Stop reading; a completed job drops its checkpoint so a re-run starts fresh"""
+        self.reader.close()
+        if completed:
+            self.checkpoint.remove()
+
+    def fps(self):
+        elapsed = time.perf_counter() - self.started
+        return self.frames_analyzed / elapsed if elapsed > 0 else 0.0
+
+    def header(self):
+        return {
+            "type": "job",
+            "job_id": self.job_id,
+            "path": str(self.path),
+            "sources": len(self.sources),
+            "resumed_from": self.resumed_from,
+        }
+
+    def progress(self):
+        return {
+            "type": "progress",
+            "job_id": self.job_id,
+            "frames_analyzed": self.frames_analyzed,
+            "frames_decoded": self.reader.frames_decoded,
+            "fps": round(self.fps(), 2),
+        }
+
+    def summary(self, completed):
+        return {
+            "type": "summary",
+            "job_id": self.job_id,
+            "completed": completed,
+            "frames_analyzed": self.frames_analyzed,
+            "frames_decoded": self.reader.frames_decoded,
+            "frames_skipped": self.reader.frames_skipped,
+            "total_frames_analyzed": self.checkpoint.frames_analyzed,
+            "errors": self.errors,
+            "elapsed_s": round(time.perf_counter() - self.started, 3),
+            "fps": round(self.fps(), 2),
+        }
+
+
+def frame_line(frame, result):
+    return {"type": "frame", "source": frame.source, "frame": frame.index, "time_s": frame.time_s, **result}
+
+
+def error_line(name, message):
+    return {"type": "error", "source": name, "message": message}
+
+
+async def run_cli(args):
+    import main as app
+
+    job = VideoJob(args.path, job_id=args.job_id, stride=args.stride, sample_fps=args.sample_fps,
+                   batch_size=min(args.batch_size, app.MAX_BATCH_SIZE), resume=args.resume, checkpoint_dir=args.checkpoint_dir)
+    await app.prepare_detector()
+    if not app.startup.is_ready:
+        raise SystemExit(f"Detector failed to start: {app.startup.error}")
+
+    output = sys.stdout
+    if args.output:
+        # A resumed job appends to the lines written before it was interrupted
+        output = open(args.output, "a" if job.resumed_from else "w")
+
+    summary = None
+    try:
+        async for line in app.video_job_lines(job):
+            output.write(json.dumps(line) + "\n")
+            output.flush()
+            if line["type"] == "summary":
+                summary = line
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        await app.shutdown_event()
+
+    if summary:
+        print(f"{summary['frames_analyzed']} frames in {summary['elapsed_s']}s "
+              f"({summary['fps']} frames/s), {summary['errors']} errors", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="video file or directory of videos and images")
+    parser.add_argument("--stride", type=int, default=1, help="analyze every Nth frame")
+    parser.add_argument("--sample-fps", type=float, help="analyze about this many frames per second of video")
+    parser.add_argument("--batch-size", type=int, default=int(os.environ.get("AI_MAX_BATCH_SIZE", "8")))
+    parser.add_argument("--job-id", help="checkpoint name; defaults to a hash of the path and sampling")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", help="ignore any checkpoint")
+    parser.add_argument("--checkpoint-dir",
+                        default=os.environ.get("AI_VIDEO_CHECKPOINT_DIR", str(DEFAULT_CHECKPOINT_DIR)))
+    parser.add_argument("--output", help="NDJSON file (appended to when resuming); stdout by default")
+    args = parser.parse_args()
+    asyncio.run(run_cli(args))
+
+
+if __name__ == "__main__":
+    main()
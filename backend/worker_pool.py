@@ -0,0 +1,348 @@
+import importlib
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+import metrics
+from ingest import MODEL_INPUT_SIZE
+from scheduler import QueueFullError
+
+
+class WorkerCrashedError(Exception):
+    """Raised for jobs that were in flight on a worker that died"""
+
+
+def load_factory(spec):
+    """Resolve a "module:function" detector factory returning (detect_batch, method name, class names)"""
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def pin_threads(threads):
+    """Cap torch/OpenMP/OpenCV threads before the detector is loaded"""
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except Exception:
+        pass
+    try:
+        import cv2
+        cv2.setNumThreads(threads)
+    except Exception:
+        pass
+
+
+def worker_main(index, factory_spec, shm_name, slot_bytes, jobs, results, threads):
+    """Inference worker: read frames out of shared-memory slots, run the detector, post results"""
+    pin_threads(threads)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    detect_batch, method, classes = load_factory(factory_spec)()
+    # Warm up before reporting ready so the first real batch does not pay for lazy init
+    detect_batch([np.zeros((480, 640, 3), dtype=np.uint8)])
+    metrics.export_process(reset=True)
+    results.put(("ready", None, {"pid": os.getpid(), "method": method, "classes": classes}, None))
+
+    while True:
+        message = jobs.get()
+        if message is None:
+            break
+        job_id, frames = message
+        images = [
+            np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+            for slot, shape in frames
+        ]
+        try:
+            detections = detect_batch(images)
+            results.put(("done", job_id, detections, metrics.export_process(reset=True)))
+        except Exception as e:
+            results.put(("error", job_id, f"{type(e).__name__}: {e}", metrics.export_process(reset=True)))
+        del images
+
+    shm.close()
+
+
+def fit_slot(image, slot_bytes):
+    """Shrink a frame that does not fit a shared-memory slot to the model input size; returns (frame, box scale)"""
+    if image.nbytes <= slot_bytes:
+        return image, 1.0
+    height, width = image.shape[:2]
+    # The detector letterboxes to MODEL_INPUT_SIZE anyway, so this loses no detail the model would see
+    scale = min(MODEL_INPUT_SIZE / max(width, height), (slot_bytes / image.nbytes) ** 0.5)
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), width / size[0]
+
+
+def rescale_boxes(detections, factor):
+    if factor == 1.0:
+        return detections
+    return [
+        {**d, "box": [value * factor for value in d["box"]]} if d.get("box") is not None else d
+        for d in detections
+    ]
+
+
+class Job:
+    def __init__(self, slots):
+        self.slots = slots
+        self.started = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.queued = False
+
+
+class Worker:
+    """Parent-side handle: process, queues, shared-memory slot ring and in-flight jobs"""
+
+    def __init__(self, index, slots, slot_bytes):
+        self.index = index
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.free_slots = list(range(slots))
+        self.inflight = {}
+        self.process = None
+        self.jobs = None
+        self.results = None
+        self.collector = None
+        self.ready = threading.Event()
+        self.pid = None
+        self.method = None
+        self.classes = []
+        self.completed = 0
+        self.restarts = 0
+
+    def load(self):
+        """Frames currently assigned to this worker"""
+        # Copied first: the collector thread pops jobs while /ai/status reads this without the lock
+        return sum(len(job.slots) for job in list(self.inflight.values()))
+
+    def oldest_job_age(self, now):
+        return max((now - job.started for job in list(self.inflight.values())), default=0.0)
+
+    def write(self, slot, image):
+        view = np.ndarray(image.shape, dtype=np.uint8, buffer=self.shm.buf,
+                          offset=slot * self.slot_bytes)
+        view[...] = image
+
+
+class WorkerPool:
+    """Least-loaded pool of detector processes fed through shared-memory ring buffers"""
+
+    def __init__(self, factory_spec, workers=2, slots=16, slot_bytes=4 * 1024 * 1024,
+                 threads=1, health_interval_s=1.0, ready_timeout_s=120.0, job_timeout_s=30.0):
+        self.factory_spec = factory_spec
+        self.slot_bytes = slot_bytes
+        self.threads = threads
+        self.health_interval_s = health_interval_s
+        self.ready_timeout_s = ready_timeout_s
+        self.job_timeout_s = job_timeout_s
+        self.context = mp.get_context("spawn")
+        self.workers = [Worker(index, slots, slot_bytes) for index in range(workers)]
+        self.lock = threading.Lock()
+        self.job_ids = itertools.count()
+        self.stopping = threading.Event()
+        self.monitor = None
+
+    @property
+    def detection_method(self):
+        return next((worker.method for worker in self.workers if worker.method), None)
+
+    @property
+    def detection_classes(self):
+        return next((worker.classes for worker in self.workers if worker.method), [])
+
+    def _launch(self, worker):
+        worker.ready.clear()
+        worker.jobs = self.context.Queue()
+        worker.results = self.context.Queue()
+        worker.process = self.context.Process(
+            target=worker_main,
+            args=(worker.index, self.factory_spec, worker.shm.name, self.slot_bytes,
+                  worker.jobs, worker.results, self.threads),
+            name=f"inference-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        worker.collector = threading.Thread(
+            target=self._collect, args=(worker, worker.process, worker.results), daemon=True
+        )
+        worker.collector.start()
+
+    def start(self):
+        """Start every worker and wait until each has loaded its detector"""
+        for worker in self.workers:
+            self._launch(worker)
+        deadline = time.monotonic() + self.ready_timeout_s
+        for worker in self.workers:
+            if not worker.ready.wait(max(0.0, deadline - time.monotonic())):
+                raise RuntimeError(f"Inference worker {worker.index} did not become ready")
+        self.monitor = threading.Thread(target=self._monitor, daemon=True)
+        self.monitor.start()
+
+    def stop(self):
+        self.stopping.set()
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.jobs.put(None)
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(timeout=5)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+            self._fail_inflight(worker, RuntimeError("Worker pool stopped"))
+            worker.shm.close()
+            worker.shm.unlink()
+
+    def _collect(self, worker, process, results):
+        """Route results from one worker process back to the waiting jobs"""
+        while not self.stopping.is_set() and worker.process is process:
+            try:
+                kind, job_id, payload, worker_metrics = results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+
+            if kind == "ready":
+                worker.pid = payload["pid"]
+                worker.method = payload["method"]
+                worker.classes = payload["classes"]
+                worker.ready.set()
+                continue
+
+            # Stage timings recorded in the worker process are folded into this process's /metrics
+            metrics.merge_process(worker_metrics)
+
+            with self.lock:
+                job = worker.inflight.pop(job_id, None)
+                if job is None:
+                    continue
+                worker.free_slots.extend(job.slots)
+                worker.completed += 1
+            if kind == "done":
+                job.result = payload
+            else:
+                job.error = RuntimeError(payload)
+            job.done.set()
+
+    def _fail_inflight(self, worker, error):
+        with self.lock:
+            jobs = list(worker.inflight.values())
+            for job in jobs:
+                job.error = error
+                # Slots of a job still being written are returned by the thread writing them
+                if job.queued:
+                    worker.free_slots.extend(job.slots)
+            worker.inflight.clear()
+        for job in jobs:
+            job.done.set()
+
+    def _restart(self, worker, error):
+        with self.lock:
+            # From here no job is reserved on this worker or queued to its old process
+            worker.ready.clear()
+        process = worker.process
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+                process.join(timeout=5)
+        self._fail_inflight(worker, error)
+        worker.restarts += 1
+        with self.lock:
+            self._launch(worker)
+
+    def _monitor(self):
+        """Restart workers whose process has died or that sit on a job past its timeout"""
+        while not self.stopping.wait(self.health_interval_s):
+            now = time.monotonic()
+            for worker in self.workers:
+                if not worker.process.is_alive():
+                    print(f"⚠️ Inference worker {worker.index} exited "
+                          f"(code {worker.process.exitcode}), restarting")
+                    self._restart(worker, WorkerCrashedError(f"Worker {worker.index} crashed"))
+                elif worker.oldest_job_age(now) > self.job_timeout_s:
+                    # A hung worker would otherwise keep its slots reserved for good
+                    print(f"⚠️ Inference worker {worker.index} is stuck on a job, restarting")
+                    self._restart(worker, WorkerCrashedError(f"Worker {worker.index} hung"))
+
+    def _reserve(self, count):
+        """Pick the least-loaded live worker with enough free slots"""
+        with self.lock:
+            candidates = [
+                worker for worker in self.workers
+                if worker.ready.is_set() and worker.process.is_alive()
+                and len(worker.free_slots) >= count
+            ]
+            if not candidates:
+                raise QueueFullError("No inference worker has free frame slots")
+            # Ties go to the worker that has done the least, spreading work across idle workers
+            worker = min(candidates, key=lambda w: (w.load(), w.completed))
+            slots = [worker.free_slots.pop() for _ in range(count)]
+            job_id = next(self.job_ids)
+            job = Job(slots)
+            worker.inflight[job_id] = job
+            return worker, job_id, job
+
+    def detect_batch(self, images):
+        """Run a batch on one worker; blocks the calling thread until results arrive"""
+        if any(image.dtype != np.uint8 for image in images):
+            raise ValueError("Worker frames must be uint8")
+        fitted = [fit_slot(image, self.slot_bytes) for image in images]
+        images = [image for image, _ in fitted]
+
+        worker, job_id, job = self._reserve(len(images))
+        try:
+            for slot, image in zip(job.slots, images):
+                worker.write(slot, image)
+            with self.lock:
+                # A restart during the write has failed the job and left its slots to this thread
+                if worker.inflight.get(job_id) is job:
+                    worker.jobs.put((job_id, [(slot, image.shape) for slot, image in zip(job.slots, images)]))
+                    job.queued = True
+                else:
+                    worker.free_slots.extend(job.slots)
+        except Exception:
+            with self.lock:
+                worker.inflight.pop(job_id, None)
+                worker.free_slots.extend(job.slots)
+            raise
+        if not job.queued:
+            raise job.error
+
+        if not job.done.wait(self.job_timeout_s):
+            # Slots stay reserved until the worker answers or the monitor restarts it as hung
+            raise TimeoutError(f"Worker {worker.index} did not answer in {self.job_timeout_s}s")
+        if job.error is not None:
+            raise job.error
+        return [rescale_boxes(detections, factor) for detections, (_, factor) in zip(job.result, fitted)]
+
+    def status(self):
+        return {
+            "workers": [
+                {
+                    "index": worker.index,
+                    "pid": worker.pid,
+                    "alive": worker.process is not None and worker.process.is_alive(),
+                    "ready": worker.ready.is_set(),
+                    "inflight_frames": worker.load(),
+                    "free_slots": len(worker.free_slots),
+                    "completed_batches": worker.completed,
+                    "restarts": worker.restarts,
+                }
+                for worker in self.workers
+            ],
+            "threads_per_worker": self.threads,
+            "slot_bytes": self.slot_bytes,
+        }